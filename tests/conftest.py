@@ -0,0 +1,110 @@
+"""
+tools/ 以下のスクリプトをテストから読み込むための共通設定
+
+各ツールはパッケージではなく単体のスクリプト（しかも main.py という同名ファイル）なので、
+ファイルのパスを指定して別々のモジュール名で読み込む。
+"""
+import asyncio
+import importlib.util
+import re
+from collections import deque
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+TOOLS_DIR = Path(__file__).parent.parent / "tools"
+
+
+def load_tool(name, relative_path):
+    """
+    tools/ 以下のスクリプトをモジュールとして読み込む
+
+    Args:
+        name (str): 読み込み後のモジュール名
+        relative_path (str): tools/ からの相対パス
+
+    Returns:
+        module: 読み込んだモジュール
+    """
+    spec = importlib.util.spec_from_file_location(name, TOOLS_DIR / relative_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def batch_reply(answer):
+    """
+    まとめて送ったプロンプトの【行N】ごとに、同じ回答を行番号付きで返す関数を作る
+
+    Args:
+        answer (str): 1件分の回答
+
+    Returns:
+        function: プロンプト -> 回答テキスト
+    """
+    def reply(prompt):
+        numbers = re.findall(r"【行(\d+)】", prompt)
+        return "\n".join(f"{number},{answer}" for number in numbers)
+    return reply
+
+
+class FakeModel:
+    """
+    Gemini APIを呼ばずに決まった回答を返すモデル（送られたプロンプトを記録する）
+    """
+
+    def __init__(self, reply):
+        """
+        Args:
+            reply (function): プロンプト -> 回答テキスト
+        """
+        self.reply = reply
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=self.reply(prompt))
+
+
+@pytest.fixture(scope="session")
+def analyze_translation():
+    return load_tool("analyze_translation_main", "analyze_translation/main.py")
+
+
+@pytest.fixture(scope="session")
+def analyze_dmis():
+    return load_tool("analyze_dmis_main", "analyze_dmis/main.py")
+
+
+@pytest.fixture(scope="session")
+def dmis_analyze():
+    return load_tool("dmis_analyze_main", "dmis_analyze/main.py")
+
+
+@pytest.fixture(scope="session")
+def generate_alignment():
+    pytest.importorskip("torch")
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("nltk")
+    return load_tool("generate_alignment", "generate_alignment/generate_alignment.py")
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    """
+    作業ディレクトリを一時フォルダに移し、レート制限の待ち時間をなくす
+    （キャッシュ・途中経過・エラーログは一時フォルダに作られる）
+    """
+    monkeypatch.chdir(tmp_path)
+
+    def setup(module, reply):
+        model = FakeModel(reply)
+        monkeypatch.setattr(module, "MODEL", model)
+        monkeypatch.setattr(module, "RATE_LIMIT_PERIOD", 0.001)
+        # レート制限の状態はイベントループごとに作り直す
+        monkeypatch.setattr(module, "_request_times", deque())
+        monkeypatch.setattr(module, "_rate_lock", asyncio.Lock())
+        return model
+
+    return setup
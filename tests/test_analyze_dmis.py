@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+import pandas as pd
+
+from conftest import batch_reply
+
+
+def make_df():
+    return pd.DataFrame({
+        "Highlight_JP": ["先生と呼んでいた。", "酒を飲んだ。"],
+        "Highlight_EN": ["I called him Sensei.", "He drank sake."],
+        "Note": ["先生", "酒"],
+        "文化的要素の対応訳": ["Sensei", "sake"],
+    })
+
+
+def test_parse_response_keeps_commas_in_reason(analyze_dmis):
+    result = analyze_dmis.parse_response("Acceptance,補足なく音写しており, 差異を認識させているため。")
+    assert result == ("Acceptance", "補足なく音写しており, 差異を認識させているため。")
+
+
+def test_parse_response_reports_malformed_answer(analyze_dmis):
+    assert analyze_dmis.parse_response("回答できません")[0] == "解析エラー"
+
+
+def test_parse_response_rejects_unknown_stage(analyze_dmis):
+    assert analyze_dmis.parse_response("Sensei,Acceptance,理由")[0] == "解析エラー"
+
+
+def test_parse_response_returns_canonical_stage_name(analyze_dmis):
+    # 回答の大文字・小文字に関わらず、DMIS_STAGESの表記で返す
+    assert analyze_dmis.parse_response("MINIMIZATION,理由")[0] == "Minimization"
+
+
+def test_checkpoint_round_trip(analyze_dmis, tmp_path):
+    path = tmp_path / "out.partial.csv"
+    result = ("Acceptance", "理由, カンマ入り")
+
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        f.write("key,DMIS,DMISの選出理由\n")
+        analyze_dmis.save_checkpoint(f, "prompt", result)
+
+    assert analyze_dmis.load_checkpoint(path) == {analyze_dmis.cache_key("prompt"): result}
+
+
+def test_analyze_all_uses_cache_on_rerun(analyze_dmis, fake_api):
+    model = fake_api(analyze_dmis, batch_reply("Acceptance,理由"))
+
+    results = asyncio.run(analyze_dmis.analyze_all(make_df()))
+    assert results == [("Acceptance", "理由")] * 2
+    assert len(model.prompts) == 1
+
+    os.remove(analyze_dmis.CHECKPOINT_CSV_PATH)
+    assert asyncio.run(analyze_dmis.analyze_all(make_df())) == results
+    assert len(model.prompts) == 1
@@ -0,0 +1,183 @@
+import asyncio
+import os
+
+import pandas as pd
+
+from conftest import batch_reply
+
+
+def make_df():
+    return pd.DataFrame({
+        "Highlight_JP": ["先生と呼んでいた。", "酒を飲んだ。", None],
+        "Highlight_EN": ["I called him Sensei.", "He drank sake.", "Missing."],
+        "Note": ["先生", "酒", "なし"],
+    })
+
+
+# ========================================
+# 回答パース
+# ========================================
+
+def test_parse_response_keeps_commas_in_reason(analyze_translation):
+    result = analyze_translation.parse_response("Sensei,Borrowing,原文「先生」を音写し, 補足説明を加えていないため。")
+    assert result == ("Sensei", "Borrowing", "原文「先生」を音写し, 補足説明を加えていないため。")
+
+
+def test_parse_response_allows_commas_in_term(analyze_translation):
+    # SYSTEM_INSTRUCTIONの回答例そのもの
+    result = analyze_translation.parse_response(
+        "sake, a kind of Japanese rice wine,Amplification,原文「酒」を「sake」と借用しつつ"
+        "「a kind of Japanese rice wine」と説明（増幅）を加えているため。"
+    )
+    assert result[:2] == ("sake, a kind of Japanese rice wine", "Amplification")
+    assert result[2].startswith("原文「酒」を「sake」と借用しつつ")
+
+
+def test_parse_response_matches_multiword_method(analyze_translation):
+    assert analyze_translation.parse_response("Straw mat,Established equivalent,理由")[:2] == ("Straw mat", "Established equivalent")
+
+
+def test_parse_response_returns_canonical_method_name(analyze_translation):
+    # 回答の大文字・小文字に関わらず、TRANSLATION_METHODSの表記で返す
+    assert analyze_translation.parse_response("Straw mat,established EQUIVALENT,理由")[1] == "Established equivalent"
+    assert analyze_translation.parse_response("Sensei, borrowing ,理由")[1] == "Borrowing"
+
+
+def test_parse_response_rejects_unknown_method(analyze_translation):
+    assert analyze_translation.parse_response("sake,rice wine,理由")[1] == "解析エラー"
+
+
+def test_parse_response_reports_malformed_answer(analyze_translation):
+    term, method, reason = analyze_translation.parse_response("回答できません")
+    assert (term, method) == ("解析エラー", "解析エラー")
+    assert "回答できません" in reason
+
+
+def test_parse_response_reports_missing_answer(analyze_translation):
+    assert analyze_translation.parse_response(None)[1] == "API呼び出し失敗"
+
+
+def test_parse_batch_response_splits_by_row_number(analyze_translation):
+    answers = analyze_translation.parse_batch_response("1,Sensei,Borrowing,理由1\n2,sake,Borrowing,理由2\n")
+    assert answers == {1: "Sensei,Borrowing,理由1", 2: "sake,Borrowing,理由2"}
+
+
+def test_parse_batch_response_keeps_multiline_answers(analyze_translation):
+    answers = analyze_translation.parse_batch_response("【行1】\nSensei,Borrowing,理由の\n続き\n\n2,sake,Borrowing,理由2")
+    assert answers == {1: "Sensei,Borrowing,理由の\n続き", 2: "sake,Borrowing,理由2"}
+
+
+# ========================================
+# 回答キャッシュ・途中経過
+# ========================================
+
+def test_cache_key_depends_on_prompt_and_version(analyze_translation, monkeypatch):
+    key = analyze_translation.cache_key("prompt")
+    assert key == analyze_translation.cache_key("prompt")
+    assert key != analyze_translation.cache_key("other prompt")
+
+    monkeypatch.setattr(analyze_translation, "PROMPT_VERSION", "changed")
+    assert key != analyze_translation.cache_key("prompt")
+
+
+def test_checkpoint_round_trip(analyze_translation, tmp_path):
+    path = tmp_path / "out.partial.csv"
+    result = ("Sensei", "Borrowing", "理由, カンマ入り")
+
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        f.write("key,文化的要素の対応訳,翻訳技法,翻訳技法の選出理由\n")
+        analyze_translation.save_checkpoint(f, "prompt", result)
+
+    assert analyze_translation.load_checkpoint(path) == {analyze_translation.cache_key("prompt"): result}
+
+
+def test_load_checkpoint_skips_malformed_and_torn_rows(analyze_translation, tmp_path):
+    path = tmp_path / "out.partial.csv"
+    key = analyze_translation.cache_key("prompt")
+    # 列数が足りない行と、書き込み途中で終わった最後の行（列数はそろっている）
+    path.write_text(
+        "key,文化的要素の対応訳,翻訳技法,翻訳技法の選出理由\r\n"
+        f"{key},Sensei,Borrowing,理由\r\n"
+        "short,row\r\n"
+        'torn,sake,Borrowing,"途中で',
+        encoding="utf-8",
+        newline="",
+    )
+
+    assert analyze_translation.load_checkpoint(path) == {key: ("Sensei", "Borrowing", "理由")}
+
+
+def test_open_checkpoint_rewrites_torn_file_before_appending(analyze_translation, tmp_path):
+    path = tmp_path / "out.partial.csv"
+    key = analyze_translation.cache_key("prompt")
+    path.write_text(
+        "key,文化的要素の対応訳,翻訳技法,翻訳技法の選出理由\r\n"
+        f"{key},Sensei,Borrowing,理由\r\n"
+        'torn,sake,Borrowing,"複数行の理由が\r\n途中で',
+        encoding="utf-8",
+        newline="",
+    )
+
+    checkpoint = analyze_translation.load_checkpoint(path)
+    with analyze_translation.open_checkpoint(checkpoint, path) as f:
+        analyze_translation.save_checkpoint(f, "next prompt", ("sake", "Borrowing", "次の理由"))
+
+    assert analyze_translation.load_checkpoint(path) == {
+        key: ("Sensei", "Borrowing", "理由"),
+        analyze_translation.cache_key("next prompt"): ("sake", "Borrowing", "次の理由"),
+    }
+
+
+# ========================================
+# 全行の分析（偽のモデルを使用）
+# ========================================
+
+def test_analyze_all_uses_cache_on_rerun(analyze_translation, fake_api):
+    model = fake_api(analyze_translation, batch_reply("Sensei,Borrowing,理由"))
+
+    results = asyncio.run(analyze_translation.analyze_all(make_df()))
+    assert results[:2] == [("Sensei", "Borrowing", "理由")] * 2
+    assert results[2] == analyze_translation.MISSING_DATA_RESULT
+    assert len(model.prompts) == 1
+
+    # 途中経過を消しても、キャッシュがあればAPIは呼ばない
+    os.remove(analyze_translation.CHECKPOINT_CSV_PATH)
+    assert asyncio.run(analyze_translation.analyze_all(make_df())) == results
+    assert len(model.prompts) == 1
+
+
+def test_analyze_all_resumes_from_checkpoint(analyze_translation, fake_api):
+    model = fake_api(analyze_translation, batch_reply("Sensei,Borrowing,理由"))
+    results = asyncio.run(analyze_translation.analyze_all(make_df()))
+
+    # キャッシュを消しても、途中経過があればAPIは呼ばない
+    os.remove(analyze_translation.CACHE_PATH)
+    assert asyncio.run(analyze_translation.analyze_all(make_df())) == results
+    assert len(model.prompts) == 1
+
+
+def test_analyze_all_labels_rows_missing_from_the_answer(analyze_translation, fake_api, monkeypatch):
+    # 2件まとめて送っても1件目の回答しか返ってこない
+    model = fake_api(analyze_translation, lambda prompt: "1,Sensei,Borrowing,理由")
+    monkeypatch.setattr(analyze_translation, "MAX_RETRIES", 1)
+
+    results = asyncio.run(analyze_translation.analyze_all(make_df()))
+
+    assert results[0] == ("Sensei", "Borrowing", "理由")
+    assert results[1] == analyze_translation.MISSING_ANSWER_RESULT
+    assert len(model.prompts) == 1
+
+
+def test_checkpoint_is_not_applied_to_different_rows(analyze_translation, fake_api):
+    fake_api(analyze_translation, batch_reply("Sensei,Borrowing,理由"))
+    asyncio.run(analyze_translation.analyze_all(make_df()))
+    os.remove(analyze_translation.CACHE_PATH)
+
+    # 入力CSVを差し替えると、同じ行番号でも途中経過の結果は使わない
+    model = fake_api(analyze_translation, batch_reply("tatami,Borrowing,別の理由"))
+    df = make_df().iloc[::-1].reset_index(drop=True)
+    df.loc[0, "Highlight_JP"] = "畳に座った。"
+    results = asyncio.run(analyze_translation.analyze_all(df))
+
+    assert results[0] == ("tatami", "Borrowing", "別の理由")
+    assert len(model.prompts) == 1
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from conftest import batch_reply
+
+
+def make_df():
+    return pd.DataFrame({
+        "Highlight_JP": ["先生と呼んでいた。", "酒を飲んだ。"],
+        "Highlight_EN": ["I called him Sensei.", "He drank sake."],
+        "Note": ["先生", "酒"],
+    })
+
+
+@pytest.fixture
+def fake_slots(dmis_analyze, monkeypatch, tmp_path):
+    """
+    作業ディレクトリを一時フォルダに移し、APIキーごとの送信を偽の回答に置き換える
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(dmis_analyze, "GEMINI_API_KEYS", ["dummy-key-0001"])
+    monkeypatch.setattr(dmis_analyze, "RATE_LIMIT_PERIOD", 0.001)
+
+    def setup(reply):
+        prompts = []
+
+        async def generate_content(self, prompt):
+            prompts.append(prompt)
+            return SimpleNamespace(text=reply(prompt))
+
+        monkeypatch.setattr(dmis_analyze.ApiKeySlot, "generate_content", generate_content)
+        return prompts
+
+    return setup
+
+
+def test_parse_response_splits_four_fields(dmis_analyze):
+    result = dmis_analyze.parse_response("the sensei,Borrowing,受容,原文「先生」を借用し, 差異を提示している。")
+    assert result == ("the sensei", "Borrowing", "受容", "原文「先生」を借用し, 差異を提示している。")
+
+
+def test_parse_response_reports_malformed_answer(dmis_analyze):
+    assert dmis_analyze.parse_response("回答できません")[1] == "解析エラー"
+
+
+def test_parse_batch_response_keeps_multiline_answers(dmis_analyze):
+    answers = dmis_analyze.parse_batch_response("1,the sensei,Borrowing,受容,理由の\n続き\n2,January,Generalization,最小化,理由2")
+    assert answers == {1: "the sensei,Borrowing,受容,理由の\n続き", 2: "January,Generalization,最小化,理由2"}
+
+
+def test_token_bucket_does_not_burst(dmis_analyze):
+    async def send_all():
+        bucket = dmis_analyze.AsyncTokenBucket(dmis_analyze.RATE_LIMIT_BURST, 100)
+        start = time.monotonic()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # 1秒あたり100トークンなら、11回目の送信までに少なくとも約0.1秒かかる
+    assert asyncio.run(send_all()) >= 0.09
+
+
+def test_load_checkpoint_skips_torn_last_row(dmis_analyze, tmp_path):
+    path = tmp_path / "out.partial.csv"
+    key = dmis_analyze.cache_key("prompt")
+    path.write_text(
+        "key,文化的要素の英訳句/語,Molina&Albirの翻訳分類,ベネットの異文化感受性モデル,備考\r\n"
+        f"{key},the sensei,Borrowing,受容,理由\r\n"
+        "torn,January,Generalization,最小化,途中",
+        encoding="utf-8",
+        newline="",
+    )
+
+    assert dmis_analyze.load_checkpoint(path) == {key: ("the sensei", "Borrowing", "受容", "理由")}
+
+
+def test_process_all_resumes_from_checkpoint(dmis_analyze, fake_slots):
+    prompts = fake_slots(batch_reply("the sensei,Borrowing,受容,理由"))
+
+    results = asyncio.run(dmis_analyze.process_all(make_df()))
+    assert results == [("the sensei", "Borrowing", "受容", "理由")] * 2
+    assert len(prompts) == 1
+
+    # キャッシュを消しても、途中経過があればAPIは呼ばない
+    os.remove(dmis_analyze.CACHE_PATH)
+    assert asyncio.run(dmis_analyze.process_all(make_df())) == results
+    assert len(prompts) == 1
@@ -0,0 +1,35 @@
+def test_iter_text_chunks_covers_whole_text(generate_alignment, tmp_path):
+    paragraphs = [f"Paragraph {i} ends here." for i in range(20)]
+    text = "\n\n".join(paragraphs)
+    path = tmp_path / "book.txt"
+    path.write_text(text, encoding="utf-8")
+
+    chunks = list(generate_alignment.iter_text_chunks(path, chunk_size=40))
+
+    # つなげると元のテキストに戻り、最後以外のかたまりは空行の直前で終わる
+    assert "".join(chunks) == text
+    assert len(chunks) > 1
+    assert all(text[len("".join(chunks[:i + 1])):].startswith("\n\n") for i in range(len(chunks) - 1))
+
+
+def test_iter_text_chunks_does_not_split_inside_sentence(generate_alignment, tmp_path):
+    # ページ区切りで文の途中に空行が入っている場合は、そこでは区切らない
+    text = "The first sentence ends here.\n\nIt was not until he\n\nfastened the sash that he noticed.\n\nThe end."
+    path = tmp_path / "book.txt"
+    path.write_text(text, encoding="utf-8")
+
+    chunks = list(generate_alignment.iter_text_chunks(path, chunk_size=1))
+
+    assert chunks == [
+        "The first sentence ends here.",
+        "\n\nIt was not until he\n\nfastened the sash that he noticed.",
+        "\n\nThe end.",
+    ]
+
+
+def test_iter_text_chunks_keeps_multibyte_characters(generate_alignment, tmp_path):
+    text = "“Sensei,” I said.\n\n" * 50
+    path = tmp_path / "book.txt"
+    path.write_text(text, encoding="utf-8")
+
+    assert "".join(generate_alignment.iter_text_chunks(path, chunk_size=64)) == text
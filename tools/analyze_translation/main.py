@@ -7,11 +7,20 @@
 3. 結果を元のCSVに追加して保存
 """
 import os
+import re
+import atexit
+import csv
 import time
+import random
+import asyncio
+import hashlib
+import sqlite3
 import pandas as pd
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from collections import deque
 from dotenv import load_dotenv
-from tqdm import tqdm  # 進捗バー（オプション）
+from tqdm.asyncio import tqdm_asyncio  # 進捗バー（オプション）
 from pathlib import Path
 
 # ========================================
@@ -29,55 +38,61 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # 無料かつ最新のモデルはリリースノートで確認
 MODEL_NAME = "gemini-2.5-flash"
 
-# レート制限対応：10 RPM = # 6秒に1リクエスト
+# Geminiモデル（main()でAPI初期化後に一度だけ生成して使い回す）
+MODEL = None
+
+# レート制限対応：10 RPM = 直近60秒間に最大10リクエスト
 # 無料範囲内で収まるように設定
-REQUEST_INTERVAL = 6  # 秒
+RATE_LIMIT_REQUESTS = 10  # 回
+RATE_LIMIT_PERIOD = 60  # 秒
+
+# 並列処理設定：同時に送信中にできるリクエスト数の上限（RPMの上限に合わせる）
+CONCURRENCY = 10
+
+# バッチ設定：1回のリクエストにまとめて分析する行数
+BATCH_SIZE = 10
 
 # リトライ設定
 MAX_RETRIES = 3  # 最大リトライ回数
-RETRY_DELAY = 5  # リトライ待機時間（秒）
+RETRY_DELAY = 5  # リトライ待機時間の初期値（秒）。試行ごとに倍にし、0〜1秒のゆらぎを加える
+RETRY_MAX_DELAY = 60  # リトライ待機時間の上限（秒）
+
+# リトライしても解決する見込みのある一時的なエラー（レート制限・サーバー側の障害）
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
 
 
 # --- ファイルパスの設定 ---
 INPUT_CSV_PATH = "test.csv"
 OUTPUT_CSV_PATH = "test_analyzed.csv"
 LOG_FILE = "error_log.txt"  # エラーログ
+# 途中経過（1行分析するごとに追記し、中断後の再実行時はここから再開する）
+CHECKPOINT_CSV_PATH = Path(OUTPUT_CSV_PATH).with_suffix(".partial.csv")
 
+# --- 入出力列の設定 ---
+# 分析結果として追加する列
+OUTPUT_COLUMNS = ["文化的要素の対応訳", "翻訳技法", "翻訳技法の選出理由"]
+# プロンプトに渡す列（CSVに存在しない列は空欄として扱う）
+INPUT_COLUMNS = ["Highlight_JP", "Highlight_EN", "Note", "注釈"]
 
-def create_prompt(highlight_jp, highlight_en, note="", annotation=""):
-    """
-    Gemini APIに送るプロンプトを生成
+# --- キャッシュの設定 ---
+# 同じプロンプトの回答を保存し、再実行時のAPI呼び出しを省略する
+CACHE_PATH = "gemini_cache.sqlite3"
+# プロンプトのバージョン（create_promptやSYSTEM_INSTRUCTIONを変更したら更新し、古い回答を無効化する）
+PROMPT_VERSION = "translation-v4"
 
-    Args:
-        highlight_jp (str): 日本語原文
-        highlight_en (str): 英訳
-        note (str): メモ・キーワード
-        annotation (str): 注釈
-        
-    Returns:
-        str: 生成されたプロンプト
-    """
-    # 空欄の場合は「なし」に変換
-    note = note if pd.notna(note) and note.strip() else "なし"
-    annotation = annotation if pd.notna(annotation) and annotation.strip() else "なし"
-    
-    prompt = f"""以下の日本語原文と英訳を、一つの文化要素（キーワード）に焦点を当てて分析してください。
-
-【日本語原文】
-{highlight_jp}
 
-【英訳】
-{highlight_en}
-
-【キーワード（文化的要素）】
-{note}
-
-【注釈】
-{annotation}
-
----
+# ========================================
+# プロンプト
+# ========================================
 
-あなたの役割：
+# 全行で共通の指示（役割・分類基準・出力形式）
+# モデル生成時にsystem_instructionとして一度だけ渡し、行ごとのプロンプトには含めない
+SYSTEM_INSTRUCTION = """あなたの役割：
 翻訳研究者として、指定されたキーワード（文化的要素）がどのように翻訳されているかを分析し、
 以下の翻訳技法分類に基づいて分類してください。
 
@@ -91,7 +106,7 @@ def create_prompt(highlight_jp, highlight_en, note="", annotation=""):
 - Amplification: 「Borrowing（借用）」に加え、原文にない詳細（情報や説明的パラフレーズ）を加える。`注釈`に補足説明がある場合もAmplificationにあたる。
 
     - 例：「先生」-> "Sensei,〈詳細〉"、「先生」 -> "Sensei"+注釈でSenseiについての説明、「先生」など
-    - 補足：この「詳細」には、訳文の脚注や注釈（{annotation}）に含まれる説明も含むこととする。
+    - 補足：この「詳細」には、訳文の脚注や【注釈】に含まれる説明も含むこととする。
 
 - Calque: 外国語の語句を逐語訳して取り入れる。語順は保たれる必要はない。
 
@@ -148,18 +163,108 @@ stop living,Modulation,「死ぬ」という概念を、視点を変えて「sto
 cake,Reduction,原文にあった「鳶色」に相当する色情報が訳文の「cake」では完全に省略されているため。
 
 
-※ 必ず3項目をカンマ区切りで1行のみ出力する。
+※ 1件につき必ず3項目をカンマ区切りで1行のみ出力する。
+"""
+
+
+def _or_none(value):
+    """
+    空欄（欠損値・空白のみの文字列）なら「なし」、それ以外は前後の空白を除いた文字列を返す
+    
+    Args:
+        value (str): セルの値（欠損値の場合もある）
+        
+    Returns:
+        str: プロンプトに埋め込む文字列
+    """
+    return value.strip() if isinstance(value, str) and value.strip() else "なし"
+
+
+def create_prompt(highlight_jp, highlight_en, note="", annotation=""):
+    """
+    Gemini APIに送るプロンプトを生成
+
+    Args:
+        highlight_jp (str): 日本語原文
+        highlight_en (str): 英訳
+        note (str): メモ・キーワード
+        annotation (str): 注釈
+        
+    Returns:
+        str: 生成されたプロンプト
+    """
+    # 空欄の場合は「なし」に変換
+    note = _or_none(note)
+    annotation = _or_none(annotation)
+    
+    # 分析の指示はcreate_batch_promptでまとめて1回だけ付ける
+    prompt = f"""【日本語原文】
+{highlight_jp}
+
+【英訳】
+{highlight_en}
+
+【キーワード（文化的要素）】
+{note}
+
+【注釈】
+{annotation}
 """
     return prompt
 
 
+def create_batch_prompt(prompts):
+    """
+    複数行分のプロンプトを1回のリクエスト用にまとめる
+    
+    Args:
+        prompts (list): create_promptで生成した行ごとのプロンプト
+        
+    Returns:
+        str: まとめたプロンプト
+    """
+    items = "\n".join(f"【行{number}】\n{prompt}" for number, prompt in enumerate(prompts, 1))
+    
+    return f"""以下の{len(prompts)}件の日本語原文と英訳を、それぞれ一つの文化要素（キーワード）に焦点を当てて独立に分析してください。
+
+{items}
+---
+
+出力はちょうど{len(prompts)}行とし、1行に1件ずつ、回答形式の先頭に行番号とカンマを付けて出力する。
+例：1,<1件目の回答>
+"""
+
+
 # ========================================
 # Gemini API呼び出し
 # ========================================
 
-def call_gemini_api(prompt, retries=MAX_RETRIES):
+# レート制限用：直近RATE_LIMIT_PERIOD秒以内に送信したリクエストの時刻（time.monotonic()基準）
+_request_times = deque()
+_rate_lock = asyncio.Lock()
+
+
+async def wait_for_rate_limit():
+    """
+    全リクエスト共通で、直近RATE_LIMIT_PERIOD秒間の送信数がRATE_LIMIT_REQUESTSを超えないように待機
     """
-    Gemini APIを呼び出して分析結果を取得
+    async with _rate_lock:
+        now = time.monotonic()
+        
+        # 期間外になった送信時刻を捨てる
+        while _request_times and now - _request_times[0] >= RATE_LIMIT_PERIOD:
+            _request_times.popleft()
+        
+        # 上限に達していれば、最も古い送信が期間外になるまで待機
+        if len(_request_times) >= RATE_LIMIT_REQUESTS:
+            await asyncio.sleep(RATE_LIMIT_PERIOD - (now - _request_times.popleft()))
+        
+        _request_times.append(time.monotonic())
+
+
+async def call_gemini_api(prompt, retries=MAX_RETRIES):
+    """
+    Gemini APIを非同期で呼び出して分析結果を取得
     
     Args:
         prompt (str): 送信するプロンプト
@@ -170,11 +275,11 @@ def call_gemini_api(prompt, retries=MAX_RETRIES):
     """
     for attempt in range(retries):
         try:
-            # Geminiモデルを取得
-            model = genai.GenerativeModel(MODEL_NAME)
+            # レート制限対応：送信枠が空くまで待機
+            await wait_for_rate_limit()
             
             # プロンプトを送信
-            response = model.generate_content(prompt)
+            response = await MODEL.generate_content_async(prompt)
             
             # 回答テキストを取得
             if response and response.text:
@@ -182,12 +287,17 @@ def call_gemini_api(prompt, retries=MAX_RETRIES):
             else:
                 log_error(f"API応答が空です（試行 {attempt + 1}/{retries}）")
                 
-        except Exception as e:
+        except RETRYABLE_ERRORS as e:
             log_error(f"API呼び出しエラー（試行 {attempt + 1}/{retries}）: {str(e)}")
             
-            # 最後の試行でなければ待機してリトライ
+            # 最後の試行でなければ待機してリトライ（指数バックオフ＋ゆらぎ）
             if attempt < retries - 1:
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** attempt) + random.uniform(0, 1))
+        
+        except Exception as e:
+            # 認証エラーや不正なリクエストなどはリトライしても解決しない
+            log_error(f"API呼び出しエラー（リトライ不可）: {str(e)}")
+            return None
     
     # すべてのリトライが失敗
     return None
@@ -197,6 +307,23 @@ def call_gemini_api(prompt, retries=MAX_RETRIES):
 # 回答パース
 # ========================================
 
+# 翻訳技法の名前（SYSTEM_INSTRUCTIONの【翻訳技法】と同じ）
+TRANSLATION_METHODS = [
+    "Borrowing", "Amplification", "Calque", "Literal translation", "Established equivalent", "Generalization",
+    "Particularization", "Description", "Adaptation", "Modulation", "Reduction",
+]
+# 大文字・小文字を問わず照合した翻訳技法名を、TRANSLATION_METHODSの表記に揃えるための対応表
+TRANSLATION_METHOD_NAMES = {method.lower(): method for method in TRANSLATION_METHODS}
+
+# 回答「対応訳,翻訳技法,理由」を分割する正規表現
+# 対応訳にもカンマが入りうる（例：sake, a kind of Japanese rice wine）ため、既知の翻訳技法名を区切りの目印にする
+# （理由の中のカンマはそのまま理由に含める）
+RESPONSE_PATTERN = re.compile(
+    rf"^\s*(?P<term>.+?)\s*,\s*(?P<method>{'|'.join(map(re.escape, TRANSLATION_METHODS))})\s*,\s*(?P<reason>.+)$",
+    re.S | re.I,
+)
+
+
 def parse_response(response_text):
     """
     APIの回答をパースして3項目に分割
@@ -210,29 +337,52 @@ def parse_response(response_text):
     if not response_text:
         return "API呼び出し失敗", "API呼び出し失敗", "APIからの応答がありませんでした"
     
-    try:
-        # カンマで分割（最大3分割）
-        parts = response_text.split(',', 2)
-
-        # 3項目が揃っているか確認
-        if len(parts) >= 3:
-            translated_term = parts[0].strip()
-            method = parts[1].strip()
-            reason = parts[2].strip()
-            return translated_term, method, reason
-        else:
-            # 形式が不正な場合
-            return "解析エラー", "解析エラー", f"形式不正: {response_text}"
-            
-    except Exception as e:
-        # エラー発生時
-        return "解析エラー", "解析エラー", f"パースエラー: {str(e)}"
+    match = RESPONSE_PATTERN.match(response_text)
+    if not match:
+        # 形式が不正な場合
+        return "解析エラー", "解析エラー", f"形式不正: {response_text}"
+    
+    # 翻訳技法名は集計で表記ゆれが出ないよう、回答の大文字・小文字ではなく正式な表記で返す
+    return match["term"], TRANSLATION_METHOD_NAMES[match["method"].lower()], match["reason"].strip()
+
+
+# まとめて送ったリクエストの回答で、1件分の回答の先頭を表す行番号（「1,」または「【行1】」）
+BATCH_ITEM_PATTERN = re.compile(r"^\s*(?:【行(\d+)】\s*,?|(\d+)\s*,)\s*")
+
+
+def parse_batch_response(response_text):
+    """
+    まとめて送ったリクエストの回答を行番号ごとに分割
+    
+    回答が複数行にわたる場合は、次の行番号が現れるまでの行をすべてその回答に含める
+    
+    Args:
+        response_text (str): APIからの回答
+        
+    Returns:
+        dict: 行番号 -> その行の回答
+    """
+    answers = {}
+    number = None
+    for line in response_text.splitlines():
+        match = BATCH_ITEM_PATTERN.match(line)
+        if match:
+            number = int(match[1] or match[2])
+            answers[number] = [line[match.end():]]
+        elif number is not None:
+            answers[number].append(line)
+    
+    return {number: "\n".join(lines).strip() for number, lines in answers.items()}
 
 
 # ========================================
 # ログ出力
 # ========================================
 
+# エラーログのファイル（最初の書き込み時に一度だけ開き、終了時に閉じる）
+_log_file = None
+
+
 def log_error(message):
     """
     エラーログをファイルに出力
@@ -240,15 +390,19 @@ def log_error(message):
     Args:
         message (str): ログメッセージ
     """
+    global _log_file
+    
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     log_message = f"[{timestamp}] {message}\n"
     
     # コンソールにも表示
     print(f"⚠️  {message}")
     
-    # ファイルに追記
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(log_message)
+    # ファイルに追記（行バッファリングなので1行ごとに書き出される）
+    if _log_file is None:
+        _log_file = open(LOG_FILE, "a", encoding="utf-8", buffering=1)
+        atexit.register(_log_file.close)
+    _log_file.write(log_message)
 
 
 # ========================================
@@ -266,7 +420,7 @@ def load_csv(file_path):
         DataFrame: 読み込んだデータ（失敗時はNone）
     """
     try:
-        # UTF-8で読み込み
+        # UTF-8で読み込み（Cエンジンで読み込む。pyarrowエンジンは引用符の後の空白などを許容しない）
         df = pd.read_csv(file_path, encoding="utf-8")
         
         # 必須列の確認
@@ -292,6 +446,298 @@ def load_csv(file_path):
         return None
 
 
+# ========================================
+# 回答キャッシュ
+# ========================================
+
+def open_cache(file_path=CACHE_PATH):
+    """
+    回答キャッシュ（SQLite）を開く
+    
+    Args:
+        file_path (str): キャッシュファイルのパス
+        
+    Returns:
+        Connection: キャッシュのDB接続
+    """
+    conn = sqlite3.connect(file_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+    return conn
+
+
+def cache_key(prompt):
+    """
+    プロンプトとプロンプトのバージョンからキャッシュキーを生成
+    
+    Args:
+        prompt (str): 送信するプロンプト
+        
+    Returns:
+        str: キャッシュキー（SHA-256）
+    """
+    return hashlib.sha256(f"{PROMPT_VERSION}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def cache_get(cache, prompt):
+    """
+    キャッシュから回答を取得
+    
+    Args:
+        cache (Connection): キャッシュのDB接続
+        prompt (str): 送信するプロンプト
+        
+    Returns:
+        str: 保存済みの回答（未保存の場合はNone）
+    """
+    row = cache.execute("SELECT response FROM responses WHERE key = ?", (cache_key(prompt),)).fetchone()
+    return row[0] if row else None
+
+
+def cache_set(cache, prompt, response):
+    """
+    回答をキャッシュに保存
+    
+    Args:
+        cache (Connection): キャッシュのDB接続
+        prompt (str): 送信したプロンプト
+        response (str): APIからの回答
+    """
+    with cache:
+        cache.execute("INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (cache_key(prompt), response))
+
+
+# ========================================
+# 途中経過の保存
+# ========================================
+
+def load_checkpoint(file_path=CHECKPOINT_CSV_PATH):
+    """
+    途中経過ファイルから分析済みの結果を読み込み
+    
+    Args:
+        file_path (Path): 途中経過ファイルのパス
+        
+    Returns:
+        dict: キャッシュキー（プロンプトのハッシュ） -> 分析結果
+    """
+    if not os.path.exists(file_path):
+        return {}
+    
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # ヘッダ行を読み飛ばす
+        rows = list(reader)
+    
+    # 書き込み途中で終了した最後の行は、列がそろっていても値が途中で切れているため使わない
+    if checkpoint_is_torn(file_path):
+        rows = rows[:-1]
+    
+    # 列数が合わない行（壊れた行や、出力列が違う版の途中経過）は読み飛ばす
+    return {row[0]: tuple(row[1:]) for row in rows if len(row) == 1 + len(OUTPUT_COLUMNS)}
+
+
+def checkpoint_is_torn(file_path=CHECKPOINT_CSV_PATH):
+    """
+    途中経過ファイルの最後の行が書き込み途中で終わっている（改行で終わっていない）かを判定
+    
+    Args:
+        file_path (Path): 途中経過ファイルのパス
+        
+    Returns:
+        bool: 最後の行が書き込み途中ならTrue
+    """
+    with open(file_path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def open_checkpoint(checkpoint, file_path=CHECKPOINT_CSV_PATH):
+    """
+    途中経過ファイルを追記用に開く
+    
+    ファイルがなければヘッダ行から書き始める。最後の行が書き込み途中で終わっている場合は、
+    次に追記する行がその行につながらないよう、読み込めた結果だけでファイルを書き直す
+    
+    Args:
+        checkpoint (dict): load_checkpoint()で読み込んだ分析済みの結果
+        file_path (Path): 途中経過ファイルのパス
+        
+    Returns:
+        file: 追記用に開いた途中経過ファイル
+    """
+    if os.path.exists(file_path) and not checkpoint_is_torn(file_path):
+        return open(file_path, "a", newline="", encoding="utf-8")
+    
+    checkpoint_file = open(file_path, "w", newline="", encoding="utf-8")
+    writer = csv.writer(checkpoint_file)
+    writer.writerow(["key", *OUTPUT_COLUMNS])
+    writer.writerows([key, *result] for key, result in checkpoint.items())
+    return checkpoint_file
+
+
+def save_checkpoint(checkpoint_file, prompt, result):
+    """
+    1行分の分析結果を途中経過ファイルに追記
+    
+    行番号ではなくプロンプト（＝行の内容）のハッシュをキーにするため、
+    入力CSVを編集・差し替えても別の行に古い結果が当てはめられることはない
+    
+    Args:
+        checkpoint_file (file): 追記モードで開いた途中経過ファイル
+        prompt (str): その行のプロンプト
+        result (tuple): 分析結果
+    """
+    csv.writer(checkpoint_file).writerow([cache_key(prompt), *result])
+    checkpoint_file.flush()
+
+
+# ========================================
+# 行ごとの分析
+# ========================================
+
+# 必須データが欠落している行の分析結果
+MISSING_DATA_RESULT = ("", "データ欠落", "Highlight_JPまたはHighlight_ENが空です")
+
+# まとめて送ったリクエストの回答に、その行の回答が含まれていなかった場合の分析結果
+MISSING_ANSWER_RESULT = ("応答解析失敗", "応答解析失敗", "APIの回答にこの行の回答が見つかりませんでした")
+
+
+def prepare_row(index, row):
+    """
+    1行分のデータからプロンプトを生成
+    
+    Args:
+        index (int): 行のインデックス
+        row (tuple): 行データ（INPUT_COLUMNSの順）
+        
+    Returns:
+        str: 生成されたプロンプト（必須データが欠落している場合はNone）
+    """
+    # データ取得（INPUT_COLUMNSの順）
+    highlight_jp, highlight_en, note, annotation = row
+
+    # 必須項目チェック
+    if pd.isna(highlight_jp) or pd.isna(highlight_en):
+        log_error(f"行{index + 2}: 必須データが欠落")
+        return None
+    
+    # プロンプト生成
+    return create_prompt(highlight_jp, highlight_en, note, annotation)
+
+
+async def analyze_batch(batch, sem, cache, checkpoint_file):
+    """
+    複数行をまとめて1回のリクエストで分析
+    
+    Args:
+        batch (list): (行のインデックス, プロンプト) のリスト
+        sem (asyncio.Semaphore): 同時リクエスト数を制限するセマフォ
+        cache (Connection): 回答キャッシュのDB接続
+        checkpoint_file (file): 途中経過ファイル
+        
+    Returns:
+        list: 行ごとの分析結果（batchの順）
+    """
+    batch_prompt = create_batch_prompt([prompt for _, prompt in batch])
+    answers = {}
+    
+    # 回答の行数が揃わなければバッチ全体をリトライ
+    for attempt in range(MAX_RETRIES):
+        # API呼び出し（同時実行数はセマフォで制限）
+        async with sem:
+            response = await call_gemini_api(batch_prompt)
+        
+        if response is None:
+            break
+        
+        answers = parse_batch_response(response)
+        if all(number in answers for number in range(1, len(batch) + 1)):
+            break
+        
+        log_error(f"回答の行数が不正です（試行 {attempt + 1}/{MAX_RETRIES}）: {response}")
+    
+    results = []
+    for number, (index, prompt) in enumerate(batch, 1):
+        # 回答をパース（APIは応答したのにこの行の回答が見つからない場合は、API呼び出しの失敗と区別する）
+        answer = answers.get(number)
+        result = MISSING_ANSWER_RESULT if not answer and response is not None else parse_response(answer)
+        
+        # 正しく解析できた回答のみキャッシュと途中経過に保存
+        if answer and "解析エラー" not in result:
+            cache_set(cache, prompt, answer)
+            save_checkpoint(checkpoint_file, prompt, result)
+        
+        results.append(result)
+    
+    return results
+
+
+async def analyze_all(df):
+    """
+    全行を分析（キャッシュにない行はBATCH_SIZE行ずつまとめて並列にリクエスト）
+    
+    Args:
+        df (DataFrame): 分析対象のデータ
+        
+    Returns:
+        list: 行ごとの分析結果（dfの行順）
+    """
+    sem = asyncio.Semaphore(CONCURRENCY)
+    cache = open_cache()
+    
+    # 前回中断時の途中経過（プロンプトのハッシュ -> 分析結果）
+    checkpoint = load_checkpoint()
+    results = {}
+    
+    try:
+        with open_checkpoint(checkpoint) as checkpoint_file:
+            # APIに送る必要がある行だけを集める
+            pending = []
+            resumed = 0
+            for index, *row in df.reindex(columns=INPUT_COLUMNS).itertuples(index=True, name=None):
+                prompt = prepare_row(index, row)
+                if prompt is None:
+                    results[index] = MISSING_DATA_RESULT
+                    continue
+                
+                # 途中経過に同じ内容の行の結果があれば、分析済みとして飛ばす
+                key = cache_key(prompt)
+                if key in checkpoint:
+                    results[index] = checkpoint[key]
+                    resumed += 1
+                    continue
+                
+                # キャッシュに回答があればAPIを呼ばずに使う
+                cached = cache_get(cache, prompt)
+                if cached is not None:
+                    results[index] = parse_response(cached)
+                    save_checkpoint(checkpoint_file, prompt, results[index])
+                    continue
+                
+                pending.append((index, prompt))
+            
+            if resumed:
+                print(f"♻️  途中経過から再開: {resumed}行は分析済み")
+            
+            # BATCH_SIZE行ずつに分割し、進捗バー付きでまとめて実行
+            batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+            batch_results = await tqdm_asyncio.gather(
+                *(analyze_batch(batch, sem, cache, checkpoint_file) for batch in batches),
+                total=len(batches),
+                desc="処理中",
+            )
+    finally:
+        cache.close()
+    
+    for batch, batch_result in zip(batches, batch_results):
+        for (index, _), result in zip(batch, batch_result):
+            results[index] = result
+    
+    return [results[index] for index in df.index]
+
+
 # ========================================
 # メイン処理
 # ========================================
@@ -300,6 +746,8 @@ def main():
     """
     メイン処理フロー
     """
+    global MODEL
+    
     print("=" * 60)
     print("🚀 翻訳手法・異文化感受性自動分析システム 起動")
     print("=" * 60)
@@ -321,6 +769,7 @@ def main():
     
     # Gemini APIを初期化
     genai.configure(api_key=GEMINI_API_KEY)
+    MODEL = genai.GenerativeModel(MODEL_NAME, system_instruction=SYSTEM_INSTRUCTION)
     print("✅ Gemini API初期化完了")
     print()
     
@@ -333,69 +782,36 @@ def main():
     
     print()
     
-    # 出力列が存在しない場合は追加
-    if "文化的要素の対応訳" not in df.columns:
-        df["文化的要素の対応訳"] = ""
-    if "翻訳技法" not in df.columns:
-        df["翻訳技法"] = ""
-    if "翻訳技法の選出理由" not in df.columns:
-        df["翻訳技法の選出理由"] = ""
-    
     # ========================================
     # 3. 行ごとのループ処理
     # ========================================
     total_rows = len(df)
-    success_count = 0
-    error_count = 0
     
     print(f"📊 処理開始: {total_rows}行を処理します")
-    print(f"⏱️  推定時間: 約{total_rows * REQUEST_INTERVAL // 60}分")
+    print(f"⏱️  推定時間: 約{-(-total_rows // BATCH_SIZE) * RATE_LIMIT_PERIOD // RATE_LIMIT_REQUESTS // 60}分")
     print()
     
-    # 進捗バー付きループ
-    for index, row in tqdm(df.iterrows(), total=total_rows, desc="処理中"):
-        # データ取得
-        highlight_jp = row.get("Highlight_JP", "")
-        highlight_en = row.get("Highlight_EN", "")
-        note = row.get("Note", "")
-        annotation = row.get("注釈", "")
-        
-        # 必須項目チェック
-        if pd.isna(highlight_jp) or pd.isna(highlight_en):
-            log_error(f"行{index + 2}: 必須データが欠落")
-            df.at[index, "翻訳技法"] = "データ欠落"
-            df.at[index, "翻訳技法の選出理由"] = "Highlight_JPまたはHighlight_ENが空です"
-            error_count += 1
-            continue
-        
-        # プロンプト生成
-        prompt = create_prompt(highlight_jp, highlight_en, note, annotation)
-        
-        # API呼び出し
-        response = call_gemini_api(prompt)
-        
-        # 回答をパース
-        translated_term, method, reason = parse_response(response)
-        
-        # DataFrameに書き込み
-        df.at[index, "文化的要素の対応訳"] = translated_term
-        df.at[index, "翻訳技法"] = method
-        df.at[index, "翻訳技法の選出理由"] = reason
-        
-        # 成功カウント
-        if "エラー" not in method and "失敗" not in method:
-            success_count += 1
-        else:
-            error_count += 1
-        
-        # レート制限対応：次のリクエストまで待機
-        time.sleep(REQUEST_INTERVAL)
+    # 全行を並列に分析
+    results = asyncio.run(analyze_all(df))
+    
+    # 列ごとにまとめてDataFrameに書き込み
+    df["文化的要素の対応訳"] = [result[0] for result in results]
+    df["翻訳技法"] = [result[1] for result in results]
+    df["翻訳技法の選出理由"] = [result[2] for result in results]
+    
+    # 成功カウント
+    error_count = sum(1 for method in df["翻訳技法"] if "エラー" in method or "失敗" in method or "欠落" in method)
+    success_count = total_rows - error_count
     
     # ========================================
     # 4. 結果をCSVに保存
     # ========================================
     try:
+        # pandasで書き出す（pyarrowのCSV書き出しは全ての値を引用符で囲み、出力が変わるため使わない）
         df.to_csv(OUTPUT_CSV_PATH, index=False, encoding="utf-8")
+        
+        # 保存が完了したら途中経過は不要
+        os.remove(CHECKPOINT_CSV_PATH)
         print()
         print("=" * 60)
         print("✅ 処理完了！")
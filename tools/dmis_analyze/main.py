@@ -7,11 +7,20 @@
 3. 結果を元のCSVに追加して保存
 """
 import os
+import re
+import atexit
+import csv
 import time
+import random
+import asyncio
+import hashlib
+import sqlite3
 import pandas as pd
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
-from tqdm import tqdm  # 進捗バー（オプション）
+from tqdm.asyncio import tqdm_asyncio  # 進捗バー（オプション）
 from pathlib import Path
 
 # ========================================
@@ -25,17 +34,41 @@ load_dotenv()
 # APIKeyの設定
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# 複数のAPIキーを使い分ける場合はGEMINI_API_KEYSにカンマ区切りで指定（未設定ならGEMINI_API_KEYのみ）
+# キーごとにレート制限がかかるため、キーの数だけ全体の処理速度が上がる
+GEMINI_API_KEYS = [key.strip() for key in os.getenv("GEMINI_API_KEYS", GEMINI_API_KEY or "").split(",") if key.strip()]
+
 # Geminiのモデルの設定
 # 無料かつ最新のモデルはリリースノートで確認
 MODEL_NAME = "gemini-2.5-flash"
 
-# レート制限対応：10 RPM = # 6秒に1リクエスト
+# レート制限対応：10 RPM（トークンバケット方式）
 # 無料範囲内で収まるように設定
-REQUEST_INTERVAL = 6  # 秒
+RATE_LIMIT_REQUESTS = 10  # RATE_LIMIT_PERIOD秒あたりに補充されるトークン数（＝送信できるリクエスト数）
+RATE_LIMIT_PERIOD = 60  # 秒
+# 間隔を空けずに続けて送信できるリクエスト数（バケットの容量）
+# 容量をRATE_LIMIT_REQUESTSにすると、満タンの状態から最初の1分間に約2倍送れてしまい429を招くため1にする
+RATE_LIMIT_BURST = 1
+KEY_COOLDOWN = 60  # レート制限超過（429）を受けたAPIキーを休ませる時間（秒）
+
+# 並列処理設定：APIキー1つあたりの同時に送信中にできるリクエスト数の上限（RPMの上限に合わせる）
+CONCURRENCY = 10
+
+# バッチ設定：1回のリクエストにまとめて分析する行数
+BATCH_SIZE = 10
 
 # リトライ設定
 MAX_RETRIES = 3  # 最大リトライ回数
-RETRY_DELAY = 5  # リトライ待機時間（秒）
+RETRY_DELAY = 5  # リトライ待機時間の初期値（秒）。試行ごとに倍にし、0〜1秒のゆらぎを加える
+RETRY_MAX_DELAY = 60  # リトライ待機時間の上限（秒）
+
+# リトライしても解決する見込みのある一時的なエラー（レート制限・サーバー側の障害）
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
 
 
 # --- ファイルパスの設定 ---
@@ -44,42 +77,25 @@ INPUT_CSV_PATH = "proc_alignment_edwin.csv"
 OUTPUT_CSV_PATH = "test_analyzed_edwin.csv"
 # OUTPUT_CSV_PATH = "test_data_analyzed2.csv"
 LOG_FILE = "error_log.txt"  # エラーログ
+# 途中経過（1行分析するごとに追記し、中断後の再実行時はここから再開する）
+CHECKPOINT_CSV_PATH = Path(OUTPUT_CSV_PATH).with_suffix(".partial.csv")
 
+# --- キャッシュの設定 ---
+# 同じプロンプトの回答を保存し、再実行時のAPI呼び出しを省略する
+CACHE_PATH = "gemini_cache.sqlite3"
+# プロンプトのバージョン（create_promptを変更したら更新し、古い回答を無効化する）
+PROMPT_VERSION = "dmis-analyze-v4"
 
-def create_prompt(highlight_jp, highlight_en, note="", annotation=""):
-    """
-    Gemini APIに送るプロンプトを生成
+# --- 入出力列の設定 ---
+# 分析結果を書き込む列（parse_responseの返り値の順）
+OUTPUT_COLUMNS = ["文化的要素の英訳句/語", "Molina&Albirの翻訳分類", "ベネットの異文化感受性モデル", "備考"]
+# プロンプトに渡す列（CSVに存在しない列は空欄として扱う）
+INPUT_COLUMNS = ["Highlight_JP", "Highlight_EN", "Note", "注釈"]
 
-    Args:
-        highlight_jp (str): 日本語原文
-        highlight_en (str): 英訳
-        note (str): メモ・キーワード
-        annotation (str): 注釈
-        
-    Returns:
-        str: 生成されたプロンプト
-    """
-    # 空欄の場合は「なし」に変換
-    note = note if pd.notna(note) and note.strip() else "なし"
-    annotation = annotation if pd.notna(annotation) and annotation.strip() else "なし"
-    
-    prompt = f"""以下の日本語原文と英訳を、一つの文化要素（キーワード）に焦点を当てて分析してください。
-
-【日本語原文】
-{highlight_jp}
-
-【英訳】
-{highlight_en}
-
-【キーワード（文化的要素）】
-{note}
-
-【注釈】
-{annotation}
-
----
 
-あなたの役割：
+# 全行で共通の指示（役割・分類基準・出力形式）
+# リクエストのsystem_instructionとして渡し、行ごとのプロンプトには含めない
+SYSTEM_INSTRUCTION = """あなたの役割：
 翻訳者本人は DMIS の**統合段階**にいるという前提で、
 翻訳処理そのものは文化項目ごとに DMIS の任意の段階（否認〜統合）を意図的に**“演じて”選択する**、
 という研究モデルで分析してください。DMISの分類は、**読者に与えたい文化差の「見え方」**に基づきます。
@@ -153,7 +169,7 @@ def create_prompt(highlight_jp, highlight_en, note="", annotation=""):
 例：
 the sensei,借用,受容,原文「先生」を「the sensei」と借用し、日本語固有の敬称の文化的差異をそのまま提示し、読者にその受容を求めている。
 
-※ 必ず4項目をカンマ区切りで1行のみ出力する。
+※ 1件につき必ず4項目をカンマ区切りで1行のみ出力する。
 
 
 入力と出力の例
@@ -188,20 +204,214 @@ the sensei,借用,受容,原文「先生」を「the sensei」と借用し、日
 入力: 【日本語原文】 すぐその中からチョコレートを塗った鳶色のカステラを出して頰張った。 【英訳】 ...I at once attacked one decorated with chocolate. 【キーワード】 鳶色
 
 出力: なし,Reduction,否認,訳文では「鳶色」に相当する色情報が完全に削除されており、文化差の存在を否認（無視）している。
+"""
+
+
+def create_prompt(highlight_jp, highlight_en, note="", annotation=""):
+    """
+    Gemini APIに送る1行分のプロンプトを生成
+
+    Args:
+        highlight_jp (str): 日本語原文
+        highlight_en (str): 英訳
+        note (str): メモ・キーワード
+        annotation (str): 注釈
+        
+    Returns:
+        str: 生成されたプロンプト
+    """
+    # 空欄の場合は「なし」に変換
+    note = note if pd.notna(note) and note.strip() else "なし"
+    annotation = annotation if pd.notna(annotation) and annotation.strip() else "なし"
+    
+    # 分析の指示はcreate_batch_promptでまとめて1回だけ付ける
+    prompt = f"""【日本語原文】
+{highlight_jp}
+
+【英訳】
+{highlight_en}
+
+【キーワード（文化的要素）】
+{note}
+
+【注釈】
+{annotation}
 """
     return prompt
 
 
+def create_batch_prompt(prompts):
+    """
+    複数行分のプロンプトを1回のリクエスト用にまとめる
+    
+    Args:
+        prompts (list): create_promptで生成した行ごとのプロンプト
+        
+    Returns:
+        str: まとめたプロンプト
+    """
+    items = "\n".join(f"【行{number}】\n{prompt}" for number, prompt in enumerate(prompts, 1))
+    
+    return f"""以下の{len(prompts)}件の日本語原文と英訳を、それぞれ一つの文化要素（キーワード）に焦点を当てて独立に分析してください。
+
+{items}
+---
+
+出力はちょうど{len(prompts)}行とし、1行に1件ずつ、回答形式の先頭に行番号とカンマを付けて出力する。
+例：1,<1件目の回答>
+"""
+
+
 # ========================================
 # Gemini API呼び出し
 # ========================================
 
-def call_gemini_api(prompt, retries=MAX_RETRIES):
+class AsyncTokenBucket:
     """
-    Gemini APIを呼び出して分析結果を取得
+    トークンバケット方式のレート制限（非同期処理用）
+    
+    トークンが残っていればすぐに送信でき、空のときだけ補充を待つ。
+    API応答を待つ時間と送信間隔が重なるため、固定間隔で待機するより無駄がない。
+    """
+
+    def __init__(self, capacity, refill_rate):
+        """
+        Args:
+            capacity (int): バケットの容量（まとめて送信できるリクエスト数）
+            refill_rate (float): 1秒あたりに補充されるトークン数
+        """
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """
+        前回の補充からの経過時間に応じてトークンを補充
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+
+    async def acquire(self):
+        """
+        トークンを1つ取得（空の場合は補充されるまで待機）
+        """
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.refill_rate)
+                self._refill()
+            self.tokens -= 1
+
+    def available_tokens(self):
+        """
+        現時点で残っているトークン数を返す
+        """
+        self._refill()
+        return self.tokens
+
+
+class ApiKeySlot:
+    """
+    APIキー1つ分の通信クライアント・トークンバケット・休止状態をまとめたもの
+    """
+
+    def __init__(self, api_key):
+        """
+        Args:
+            api_key (str): GeminiのAPIキー
+        """
+        self.label = f"...{api_key[-4:]}"  # ログ表示用（キー全体は出さない）
+        
+        # genai.configure()はキーを1つしか持てないため、キーごとに通信クライアントを作り、リクエストを直接送る
+        # クライアントは実行中ずっと使い回し、1本のgRPC（HTTP/2）接続を全リクエストで共有する
+        # （リクエストごとにTCP/TLS接続を張り直さない）
+        self.client = glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+        
+        self.bucket = AsyncTokenBucket(RATE_LIMIT_BURST, RATE_LIMIT_REQUESTS / RATE_LIMIT_PERIOD)
+        self.cooldown_until = 0.0  # この時刻（time.monotonic()基準）まではこのキーを使わない
+
+    async def generate_content(self, prompt):
+        """
+        このキーの通信クライアントでプロンプトを送信
+        
+        Args:
+            prompt (str): 送信するプロンプト
+            
+        Returns:
+            GenerateContentResponse: APIの応答（.textで回答テキストを取得できる）
+        """
+        request = glm.GenerateContentRequest(
+            model=f"models/{MODEL_NAME}",
+            system_instruction=glm.Content(parts=[glm.Part(text=SYSTEM_INSTRUCTION)]),
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+        )
+        response = await self.client.generate_content(request)
+        return genai.types.GenerateContentResponse.from_response(response)
+
+    async def close(self):
+        """
+        使い回していた通信クライアントの接続を閉じる（イベントループが終わる前に呼ぶ）
+        """
+        await self.client.transport.close()
+
+
+async def acquire_slot(slots):
+    """
+    休止中でないAPIキーのうちトークンが最も多く残っているものを選び、トークンを1つ取得
+    
+    Args:
+        slots (list): ApiKeySlotのリスト
+        
+    Returns:
+        ApiKeySlot: 送信に使うAPIキー
+    """
+    while True:
+        now = time.monotonic()
+        available = [slot for slot in slots if slot.cooldown_until <= now]
+        
+        if available:
+            slot = max(available, key=lambda slot: slot.bucket.available_tokens())
+            tokens = slot.bucket.available_tokens()
+            if tokens >= 1:
+                await slot.bucket.acquire()
+                return slot
+            # どのキーもトークン切れなら、次のトークンが補充されるまで待ってから選び直す
+            wait = (1 - tokens) / slot.bucket.refill_rate
+        else:
+            # すべてのキーが休止中なら、最初に休止が明けるまで待ってから選び直す
+            wait = min(slot.cooldown_until for slot in slots) - now
+        
+        await asyncio.sleep(wait)
+
+
+def retry_delay_hint(error):
+    """
+    エラーにサーバーからの待機時間の指定（RetryInfo）が含まれていれば、その秒数を返す
+    
+    Args:
+        error (GoogleAPICallError): APIのエラー
+        
+    Returns:
+        float: 待機時間（秒）。指定がなければNone
+    """
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None and (retry_delay.seconds or retry_delay.nanos):
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    
+    return None
+
+
+async def call_gemini_api(prompt, slots, retries=MAX_RETRIES):
+    """
+    Gemini APIを非同期で呼び出して分析結果を取得
     
     Args:
         prompt (str): 送信するプロンプト
+        slots (list): 送信に使えるApiKeySlotのリスト
         retries (int): リトライ回数
         
     Returns:
@@ -209,11 +419,11 @@ def call_gemini_api(prompt, retries=MAX_RETRIES):
     """
     for attempt in range(retries):
         try:
-            # Geminiモデルを取得
-            model = genai.GenerativeModel(MODEL_NAME)
+            # レート制限対応：いずれかのAPIキーの送信枠が空くまで待機
+            slot = await acquire_slot(slots)
             
             # プロンプトを送信
-            response = model.generate_content(prompt)
+            response = await slot.generate_content(prompt)
             
             # 回答テキストを取得
             if response and response.text:
@@ -221,12 +431,27 @@ def call_gemini_api(prompt, retries=MAX_RETRIES):
             else:
                 log_error(f"API応答が空です（試行 {attempt + 1}/{retries}）")
                 
-        except Exception as e:
+        except google_exceptions.ResourceExhausted as e:
+            log_error(f"API呼び出しエラー（試行 {attempt + 1}/{retries}）: {str(e)}")
+            
+            # レート制限超過（429）を受けたキーはしばらく使わない（サーバーから待機時間の指定があればそれに従う）
+            # リトライは休止中でない別のキーで行われ、すべて休止中ならacquire_slotで休止明けまで待つ
+            cooldown = retry_delay_hint(e) or KEY_COOLDOWN
+            slot.cooldown_until = time.monotonic() + cooldown
+            log_error(f"APIキー {slot.label} を{cooldown:.0f}秒間休止します")
+        
+        except RETRYABLE_ERRORS as e:
             log_error(f"API呼び出しエラー（試行 {attempt + 1}/{retries}）: {str(e)}")
             
-            # 最後の試行でなければ待機してリトライ
+            # 最後の試行でなければ待機してリトライ（指数バックオフ＋ゆらぎ）
             if attempt < retries - 1:
-                time.sleep(RETRY_DELAY)
+                delay = retry_delay_hint(e) or min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** attempt) + random.uniform(0, 1)
+                await asyncio.sleep(delay)
+        
+        except Exception as e:
+            # 認証エラーや不正なリクエストなどはリトライしても解決しない
+            log_error(f"API呼び出しエラー（リトライ不可）: {str(e)}")
+            return None
     
     # すべてのリトライが失敗
     return None
@@ -244,10 +469,10 @@ def parse_response(response_text):
         response_text (str): APIからの回答
         
     Returns:
-        tuple: (翻訳手法, 異文化感受性, 備考)
+        tuple: (英訳句/語, 翻訳手法, 異文化感受性, 備考)
     """
     if not response_text:
-        return "API呼び出し失敗", "API呼び出し失敗", "APIからの応答がありませんでした"
+        return "API呼び出し失敗", "API呼び出し失敗", "API呼び出し失敗", "APIからの応答がありませんでした"
     
     try:
         # カンマで分割（最大4分割）
@@ -262,17 +487,50 @@ def parse_response(response_text):
             return translated_term, method, sensitivity, note
         else:
             # 形式が不正な場合
-            return "解析エラー", "解析エラー", f"形式不正: {response_text}"
+            return "解析エラー", "解析エラー", "解析エラー", f"形式不正: {response_text}"
             
     except Exception as e:
         # エラー発生時（4項目を返すように修正)
-        return "解析エラー", "解析エラー", f"パースエラー: {str(e)}"
+        return "解析エラー", "解析エラー", "解析エラー", f"パースエラー: {str(e)}"
+
+
+# まとめて送ったリクエストの回答で、1件分の回答の先頭を表す行番号（「1,」または「【行1】」）
+BATCH_ITEM_PATTERN = re.compile(r"^\s*(?:【行(\d+)】\s*,?|(\d+)\s*,)\s*")
+
+
+def parse_batch_response(response_text):
+    """
+    まとめて送ったリクエストの回答を行番号ごとに分割
+    
+    回答が複数行にわたる場合は、次の行番号が現れるまでの行をすべてその回答に含める
+    
+    Args:
+        response_text (str): APIからの回答
+        
+    Returns:
+        dict: 行番号 -> その行の回答
+    """
+    answers = {}
+    number = None
+    for line in response_text.splitlines():
+        match = BATCH_ITEM_PATTERN.match(line)
+        if match:
+            number = int(match[1] or match[2])
+            answers[number] = [line[match.end():]]
+        elif number is not None:
+            answers[number].append(line)
+    
+    return {number: "\n".join(lines).strip() for number, lines in answers.items()}
 
 
 # ========================================
 # ログ出力
 # ========================================
 
+# エラーログのファイル（最初の書き込み時に一度だけ開き、終了時に閉じる）
+_log_file = None
+
+
 def log_error(message):
     """
     エラーログをファイルに出力
@@ -280,15 +538,19 @@ def log_error(message):
     Args:
         message (str): ログメッセージ
     """
+    global _log_file
+    
     timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
     log_message = f"[{timestamp}] {message}\n"
     
     # コンソールにも表示
     print(f"⚠️  {message}")
     
-    # ファイルに追記
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(log_message)
+    # ファイルに追記（行バッファリングなので1行ごとに書き出される）
+    if _log_file is None:
+        _log_file = open(LOG_FILE, "a", encoding="utf-8", buffering=1)
+        atexit.register(_log_file.close)
+    _log_file.write(log_message)
 
 
 # ========================================
@@ -332,6 +594,305 @@ def load_csv(file_path):
         return None
 
 
+# ========================================
+# 回答キャッシュ
+# ========================================
+
+def open_cache(file_path=CACHE_PATH):
+    """
+    回答キャッシュ（SQLite）を開く
+    
+    Args:
+        file_path (str): キャッシュファイルのパス
+        
+    Returns:
+        Connection: キャッシュのDB接続
+    """
+    conn = sqlite3.connect(file_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+    return conn
+
+
+def cache_key(prompt):
+    """
+    プロンプトとプロンプトのバージョンからキャッシュキーを生成
+    
+    Args:
+        prompt (str): 送信するプロンプト
+        
+    Returns:
+        str: キャッシュキー（SHA-256）
+    """
+    return hashlib.sha256(f"{PROMPT_VERSION}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def cache_get(cache, prompt):
+    """
+    キャッシュから回答を取得
+    
+    Args:
+        cache (Connection): キャッシュのDB接続
+        prompt (str): 送信するプロンプト
+        
+    Returns:
+        str: 保存済みの回答（未保存の場合はNone）
+    """
+    row = cache.execute("SELECT response FROM responses WHERE key = ?", (cache_key(prompt),)).fetchone()
+    return row[0] if row else None
+
+
+def cache_set(cache, prompt, response):
+    """
+    回答をキャッシュに保存
+    
+    Args:
+        cache (Connection): キャッシュのDB接続
+        prompt (str): 送信したプロンプト
+        response (str): APIからの回答
+    """
+    with cache:
+        cache.execute("INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (cache_key(prompt), response))
+
+
+# ========================================
+# 途中経過の保存
+# ========================================
+
+def load_checkpoint(file_path=CHECKPOINT_CSV_PATH):
+    """
+    途中経過ファイルから分析済みの結果を読み込み
+    
+    Args:
+        file_path (Path): 途中経過ファイルのパス
+        
+    Returns:
+        dict: キャッシュキー（プロンプトのハッシュ） -> 分析結果
+    """
+    if not os.path.exists(file_path):
+        return {}
+    
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # ヘッダ行を読み飛ばす
+        rows = list(reader)
+    
+    # 書き込み途中で終了した最後の行は、列がそろっていても値が途中で切れているため使わない
+    if checkpoint_is_torn(file_path):
+        rows = rows[:-1]
+    
+    # 列数が合わない行（壊れた行や、出力列が違う版の途中経過）は読み飛ばす
+    return {row[0]: tuple(row[1:]) for row in rows if len(row) == 1 + len(OUTPUT_COLUMNS)}
+
+
+def checkpoint_is_torn(file_path=CHECKPOINT_CSV_PATH):
+    """
+    途中経過ファイルの最後の行が書き込み途中で終わっている（改行で終わっていない）かを判定
+    
+    Args:
+        file_path (Path): 途中経過ファイルのパス
+        
+    Returns:
+        bool: 最後の行が書き込み途中ならTrue
+    """
+    with open(file_path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def open_checkpoint(checkpoint, file_path=CHECKPOINT_CSV_PATH):
+    """
+    途中経過ファイルを追記用に開く
+    
+    ファイルがなければヘッダ行から書き始める。最後の行が書き込み途中で終わっている場合は、
+    次に追記する行がその行につながらないよう、読み込めた結果だけでファイルを書き直す
+    
+    Args:
+        checkpoint (dict): load_checkpoint()で読み込んだ分析済みの結果
+        file_path (Path): 途中経過ファイルのパス
+        
+    Returns:
+        file: 追記用に開いた途中経過ファイル
+    """
+    if os.path.exists(file_path) and not checkpoint_is_torn(file_path):
+        return open(file_path, "a", newline="", encoding="utf-8")
+    
+    checkpoint_file = open(file_path, "w", newline="", encoding="utf-8")
+    writer = csv.writer(checkpoint_file)
+    writer.writerow(["key", *OUTPUT_COLUMNS])
+    writer.writerows([key, *result] for key, result in checkpoint.items())
+    return checkpoint_file
+
+
+def save_checkpoint(checkpoint_file, prompt, result):
+    """
+    1行分の分析結果を途中経過ファイルに追記
+    
+    行番号ではなくプロンプト（＝行の内容）のハッシュをキーにするため、
+    INPUT_CSV_PATHを切り替えても別の入力の結果が当てはめられることはない
+    
+    Args:
+        checkpoint_file (file): 追記モードで開いた途中経過ファイル
+        prompt (str): その行のプロンプト
+        result (tuple): 分析結果
+    """
+    csv.writer(checkpoint_file).writerow([cache_key(prompt), *result])
+    checkpoint_file.flush()
+
+
+# ========================================
+# 行ごとの分析
+# ========================================
+
+# 必須データが欠落している行の分析結果
+MISSING_DATA_RESULT = ("データ欠落", "データ欠落", "データ欠落", "Highlight_JPまたはHighlight_ENが空です")
+
+# まとめて送ったリクエストの回答に、その行の回答が含まれていなかった場合の分析結果
+MISSING_ANSWER_RESULT = ("応答解析失敗", "応答解析失敗", "応答解析失敗", "APIの回答にこの行の回答が見つかりませんでした")
+
+
+def prepare_row(index, row):
+    """
+    1行分のデータからプロンプトを生成
+    
+    Args:
+        index (int): 行のインデックス
+        row (tuple): 行データ（INPUT_COLUMNSの順）
+        
+    Returns:
+        str: 生成されたプロンプト（必須データが欠落している場合はNone）
+    """
+    # データ取得（INPUT_COLUMNSの順）
+    highlight_jp, highlight_en, note, annotation = row
+    
+    # 必須項目チェック
+    if pd.isna(highlight_jp) or pd.isna(highlight_en):
+        log_error(f"行{index + 2}: 必須データが欠落")
+        return None
+    
+    # プロンプト生成
+    return create_prompt(highlight_jp, highlight_en, note, annotation)
+
+
+async def process_batch(batch, sem, slots, cache, checkpoint_file):
+    """
+    複数行をまとめて1回のリクエストで分析
+    
+    Args:
+        batch (list): (行のインデックス, プロンプト) のリスト
+        sem (asyncio.Semaphore): 同時リクエスト数を制限するセマフォ
+        slots (list): 送信に使えるApiKeySlotのリスト
+        cache (Connection): 回答キャッシュのDB接続
+        checkpoint_file (file): 途中経過ファイル
+        
+    Returns:
+        list: 行ごとの分析結果（batchの順）
+    """
+    batch_prompt = create_batch_prompt([prompt for _, prompt in batch])
+    answers = {}
+    
+    # 回答の行数が揃わなければバッチ全体をリトライ
+    for attempt in range(MAX_RETRIES):
+        # API呼び出し（同時実行数はセマフォで制限）
+        async with sem:
+            response = await call_gemini_api(batch_prompt, slots)
+        
+        if response is None:
+            break
+        
+        answers = parse_batch_response(response)
+        if all(number in answers for number in range(1, len(batch) + 1)):
+            break
+        
+        log_error(f"回答の行数が不正です（試行 {attempt + 1}/{MAX_RETRIES}）: {response}")
+    
+    results = []
+    for number, (index, prompt) in enumerate(batch, 1):
+        # 回答をパース（APIは応答したのにこの行の回答が見つからない場合は、API呼び出しの失敗と区別する）
+        answer = answers.get(number)
+        result = MISSING_ANSWER_RESULT if not answer and response is not None else parse_response(answer)
+        
+        # 正しく解析できた回答のみキャッシュと途中経過に保存
+        if answer and "解析エラー" not in result:
+            cache_set(cache, prompt, answer)
+            save_checkpoint(checkpoint_file, prompt, result)
+        
+        results.append(result)
+    
+    return results
+
+
+async def process_all(df):
+    """
+    全行を分析（キャッシュにない行はBATCH_SIZE行ずつまとめて並列にリクエスト）
+    
+    Args:
+        df (DataFrame): 分析対象のデータ
+        
+    Returns:
+        list: 行ごとの分析結果（dfの行順）
+    """
+    # APIキーごとに通信クライアント・トークンバケットを用意（通信クライアントはイベントループ内で作る）
+    slots = [ApiKeySlot(api_key) for api_key in GEMINI_API_KEYS]
+    sem = asyncio.Semaphore(CONCURRENCY * len(slots))
+    cache = open_cache()
+    
+    # 前回中断時の途中経過（プロンプトのハッシュ -> 分析結果）
+    checkpoint = load_checkpoint()
+    results = {}
+    
+    try:
+        with open_checkpoint(checkpoint) as checkpoint_file:
+            # APIに送る必要がある行だけを集める
+            # （行ごとにSeriesを作らないよう、必要な列だけをタプルとして取り出す）
+            pending = []
+            resumed = 0
+            for index, *row in df.reindex(columns=INPUT_COLUMNS).itertuples(index=True, name=None):
+                prompt = prepare_row(index, row)
+                if prompt is None:
+                    results[index] = MISSING_DATA_RESULT
+                    continue
+                
+                # 途中経過に同じ内容の行の結果があれば、分析済みとして飛ばす
+                key = cache_key(prompt)
+                if key in checkpoint:
+                    results[index] = checkpoint[key]
+                    resumed += 1
+                    continue
+                
+                # キャッシュに回答があればAPIを呼ばずに使う
+                cached = cache_get(cache, prompt)
+                if cached is not None:
+                    results[index] = parse_response(cached)
+                    save_checkpoint(checkpoint_file, prompt, results[index])
+                    continue
+                
+                pending.append((index, prompt))
+            
+            if resumed:
+                print(f"♻️  途中経過から再開: {resumed}行は分析済み")
+            
+            # BATCH_SIZE行ずつに分割し、進捗バー付きでまとめて実行
+            batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+            batch_results = await tqdm_asyncio.gather(
+                *(process_batch(batch, sem, slots, cache, checkpoint_file) for batch in batches),
+                total=len(batches),
+                desc="処理中",
+            )
+    finally:
+        # 使い回していた接続はイベントループが終わる前に閉じる
+        for slot in slots:
+            await slot.close()
+        cache.close()
+    
+    for batch, batch_result in zip(batches, batch_results):
+        for (index, _), result in zip(batch, batch_result):
+            results[index] = result
+    
+    return [results[index] for index in df.index]
+
+
 # ========================================
 # メイン処理
 # ========================================
@@ -348,20 +909,20 @@ def main():
     # ========================================
     # 1. APIキーの確認
     # ========================================
-    if not GEMINI_API_KEY or GEMINI_API_KEY == "your_api_key_here":
+    if not GEMINI_API_KEYS or "your_api_key_here" in GEMINI_API_KEYS:
         print("❌ エラー: APIキーが設定されていません")
         print()
         print("📝 設定方法：")
         print("1. .env ファイルを作成")
         print("2. 以下の内容を記述：")
         print("   GEMINI_API_KEY=あなたのAPIキー")
+        print("   （複数のキーを使う場合: GEMINI_API_KEYS=キー1,キー2,...）")
         print()
         print("APIキー取得: https://aistudio.google.com/app/apikey")
         return
     
-    # Gemini APIを初期化
-    genai.configure(api_key=GEMINI_API_KEY)
-    print("✅ Gemini API初期化完了")
+    # Gemini APIの通信クライアントはAPIキーごとにprocess_all()の中で作る
+    print(f"✅ Gemini API初期化完了（APIキー {len(GEMINI_API_KEYS)}個）")
     print()
     
     # ========================================
@@ -373,73 +934,35 @@ def main():
     
     print()
     
-    # 出力列が存在しない場合は追加
-    if "文化的要素の英訳句/語" not in df.columns:
-        df["文化的要素の英訳句/語"] = ""
-    if "Molina&Albirの翻訳分類" not in df.columns:
-        df["Molina&Albirの翻訳分類"] = ""
-    if "ベネットの異文化感受性モデル" not in df.columns:
-        df["ベネットの異文化感受性モデル"] = ""
-    if "備考" not in df.columns:
-        df["備考"] = ""
-    
     # ========================================
-    # 3. 行ごとのループ処理
+    # 3. 全行を並列に分析
     # ========================================
     total_rows = len(df)
-    success_count = 0
-    error_count = 0
     
     print(f"📊 処理開始: {total_rows}行を処理します")
-    print(f"⏱️  推定時間: 約{total_rows * REQUEST_INTERVAL // 60}分")
+    print(f"⏱️  推定時間: 約{-(-total_rows // BATCH_SIZE) * RATE_LIMIT_PERIOD // (RATE_LIMIT_REQUESTS * len(GEMINI_API_KEYS)) // 60}分")
     print()
     
-    # 進捗バー付きループ
-    for index, row in tqdm(df.iterrows(), total=total_rows, desc="処理中"):
-        # データ取得
-        highlight_jp = row.get("Highlight_JP", "")
-        highlight_en = row.get("Highlight_EN", "")
-        note = row.get("Note", "")
-        annotation = row.get("注釈", "")
-        
-        # 必須項目チェック
-        if pd.isna(highlight_jp) or pd.isna(highlight_en):
-            log_error(f"行{index + 2}: 必須データが欠落")
-            df.at[index, "ヴィネイとダルベルネの翻訳7分類"] = "データ欠落"
-            df.at[index, "Molina&Albirの翻訳分類"] = "データ欠落"
-            df.at[index, "備考"] = "Highlight_JPまたはHighlight_ENが空です"
-            error_count += 1
-            continue
-        
-        # プロンプト生成
-        prompt = create_prompt(highlight_jp, highlight_en, note, annotation)
-        
-        # API呼び出し
-        response = call_gemini_api(prompt)
-        
-        # 回答をパース
-        translated_term, method, sensitivity, remark = parse_response(response)
-        
-        # DataFrameに書き込み
-        df.at[index, "文化的要素の英訳句/語"] = translated_term
-        df.at[index, "Molina&Albirの翻訳分類"] = method
-        df.at[index, "ベネットの異文化感受性モデル"] = sensitivity
-        df.at[index, "備考"] = remark
-        
-        # 成功カウント
-        if "エラー" not in method and "失敗" not in method:
-            success_count += 1
-        else:
-            error_count += 1
-        
-        # レート制限対応：次のリクエストまで待機
-        time.sleep(REQUEST_INTERVAL)
+    results = asyncio.run(process_all(df))
+    
+    # 結果を列ごとにまとめてDataFrameに書き込み
+    df["文化的要素の英訳句/語"] = [result[0] for result in results]
+    df["Molina&Albirの翻訳分類"] = [result[1] for result in results]
+    df["ベネットの異文化感受性モデル"] = [result[2] for result in results]
+    df["備考"] = [result[3] for result in results]
+    
+    # 成功・エラー件数を集計（翻訳手法の列で判定）
+    error_count = int(df["Molina&Albirの翻訳分類"].str.contains("エラー|失敗|欠落").sum())
+    success_count = total_rows - error_count
     
     # ========================================
     # 4. 結果をCSVに保存
     # ========================================
     try:
         df.to_csv(OUTPUT_CSV_PATH, index=False, encoding="utf-8")
+        
+        # 保存が完了したら途中経過は不要
+        os.remove(CHECKPOINT_CSV_PATH)
         print()
         print("=" * 60)
         print("✅ 処理完了！")
@@ -1,9 +1,21 @@
 from pathlib import Path
+from functools import cache
+import hashlib
+import mmap
+import re
 import nltk
 from nltk.tokenize import sent_tokenize
+import numpy as np
 import pandas as pd
+import torch
 from sentence_transformers import SentenceTransformer, util
 
+try:
+    # 類似文の検索に使う（インストールされていなければ類似度行列を作って検索する）
+    import faiss
+except ImportError:
+    faiss = None
+
 # --- パスの設定 ---
 # 英語版のテキストファイルのパス
 TXT_PATH = Path(__file__).parent.parent.parent / "papers" / "EdwinMcClellan.txt"
@@ -11,43 +23,111 @@ TXT_PATH = Path(__file__).parent.parent.parent / "papers" / "EdwinMcClellan.txt"
 CSV_PATH = Path(__file__).parent.parent.parent / "data" / "processed" / "highlights.csv"
 # アラインメントのパス
 ALIGNMENT_PATH = Path(__file__).parent.parent.parent / "data" / "raw" / "alignment_edwin_raw.csv"
+# 埋め込みベクトルのキャッシュの保存先（同じ文の組み合わせなら再計算しない）
+EMBEDDING_CACHE_DIR = Path(__file__).parent / "embedding_cache"
+
+# --- 文分割の設定 ---
+CHUNK_SIZE = 64 * 1024  # 一度に文分割するテキストの大きさの目安（バイト）
+# 改行を空白に置き換える変換表（1回の走査でまとめて置き換える）
+NEWLINE_TO_SPACE = str.maketrans({"\n": " ", "\r": " "})
+# 文末（.!? と、その後に続く閉じ引用符・括弧）で終わっているかの判定
+SENTENCE_END = re.compile(rb'[.!?](?:["\')\]]|\xe2\x80[\x99\x9d])*\s*$')
+
+# --- モデルの設定 ---
+MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"  # GPUがあればGPUで推論する
+# GPUでは重みを半精度（FP16）にして推論を速くする（CPUはFP16の演算が遅いためFP32のまま）
+PRECISION = "fp16" if DEVICE == "cuda" else "fp32"
+BATCH_SIZE = 64  # 一度にモデルへ渡す文の数
+
+
+def iter_text_chunks(path, chunk_size=CHUNK_SIZE):
+    """テキストファイルをメモリマップで開き、段落の区切り（空行）で chunk_size バイト程度ずつ切り出して返す。"""
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < len(mm):
+            # chunk_size を超えた先で、文末の直後にある空行で区切る（ページ区切り等で文の途中にある空行では切らない）
+            end = mm.find(b"\n\n", start + chunk_size)
+            while end != -1 and not SENTENCE_END.search(mm[max(start, end - 16):end]):
+                end = mm.find(b"\n\n", end + 2)
+            end = len(mm) if end == -1 else end
+            yield mm[start:end].decode("utf-8")
+            start = end
+
+
+@cache
+def load_model():
+    """モデルを読み込む（キャッシュがすべて揃っていれば読み込み自体を省く）。"""
+    model = SentenceTransformer(MODEL_NAME, device=DEVICE)
+    if PRECISION == "fp16":
+        model = model.half()
+    return model
+
+
+def encode_with_cache(texts):
+    """文のリストを埋め込みベクトルに変換する。結果は内容のハッシュをキーにファイルへ保存して再利用する。"""
+    key = hashlib.md5("\n".join([MODEL_NAME, PRECISION, *texts]).encode("utf-8")).hexdigest()
+    cache_path = EMBEDDING_CACHE_DIR / f"{key}.npy"
+    if cache_path.exists():
+        return np.load(cache_path)
+
+    embeddings = load_model().encode(texts, batch_size=BATCH_SIZE, show_progress_bar=False, convert_to_numpy=True)
+    # 類似度の計算はFP32で行う
+    embeddings = embeddings.astype(np.float32, copy=False)
+    EMBEDDING_CACHE_DIR.mkdir(exist_ok=True)
+    np.save(cache_path, embeddings)
+    return embeddings
+
+
+def normalize(embeddings):
+    """埋め込みベクトルを長さ1に正規化する（内積がコサイン類似度になる）。"""
+    return np.ascontiguousarray(embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True), dtype=np.float32)
+
+
+def main():
+    """テキストを文に分割し、ハイライトごとに最も意味の近い英文を対応付けてCSVに保存する。"""
+    print(CSV_PATH, "を読み込みます")
+    """文単位の分解"""
+    # テキスト全体を一度に読み込まず、段落単位のかたまりごとに処理する
+    sentences = []
+    for text_en_raw in iter_text_chunks(TXT_PATH):
+        # --- 改行やノイズの削除 --- 
+        text_en_clean = text_en_raw.translate(NEWLINE_TO_SPACE)
+
+        # --- 文分割 ---
+        sentences.extend(sent_tokenize(text_en_clean))
+    print(sentences[0])
+
+    """CSVの読み込み"""
+    # --- csv読み込み ---
+    df_jp = pd.read_csv(str(CSV_PATH))
+
+    """意味類似度で自動マッチング"""
+    # 文を埋め込みベクトルに変換（前回と同じ文ならキャッシュから読み込む）
+    emb_jp = encode_with_cache(df_jp["Highlight"].tolist())
+    emb_en = encode_with_cache(sentences)
+
+    if faiss is not None:
+        # 正規化した英文のベクトルを索引に登録し、ハイライトごとに内積（＝コサイン類似度）が最大の英文を1件だけ検索
+        # （全ハイライト×全英文の類似度行列をメモリ上に作らない）
+        index = faiss.IndexFlatIP(emb_en.shape[1])
+        index.add(normalize(emb_en))
+        best_sim, best_idx = index.search(normalize(emb_jp), 1)
+        best_sim, best_idx = best_sim[:, 0], best_idx[:, 0]
+    else:
+        # 全ハイライト×全英文の類似度行列を一度に計算し、ハイライトごとに最も類似度の高い英文を選ぶ
+        best_sim, best_idx = util.cos_sim(emb_jp, emb_en).max(dim=1)
+        best_sim, best_idx = best_sim.cpu().numpy(), best_idx.cpu().numpy()
 
-print(CSV_PATH, "を読み込みます")
-"""文単位の分解"""
-# --- テキストファイルの読み込み ---
-with TXT_PATH.open("r", encoding="utf-8") as f:
-    text_en_raw = f.read()
-
-# --- 改行やノイズの削除 --- 
-text_en_clean = text_en_raw.replace("\n", " ").replace("\r", " ")
-
-# --- 文分割 ---
-sentences = sent_tokenize(text_en_clean)
-print(sentences[0])
-
-"""CSVの読み込み"""
-# --- csv読み込み ---
-df_jp = pd.read_csv(str(CSV_PATH))
-
-"""意味類似度で自動マッチング"""
-# モデル選択
-model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-
-emb_jp = model.encode(df_jp["Highlight"].tolist(), convert_to_tensor=True)
-emb_en = model.encode(sentences, convert_to_tensor=True)
-
-matches = []
-for i, e in enumerate(emb_jp):
-    sims = util.cos_sim(e, emb_en)[0]
-    best_idx = sims.argmax().item()
-    matches.append({
-        "Location": df_jp.loc[i, "Location"],
-        "Highlight_JP": df_jp.loc[i, "Highlight"],
-        "Note": df_jp.loc[i, "Note"],
-        "Highlight_EN": sentences[best_idx],
-        "Similarity": sims[best_idx].item()
+    df_out = pd.DataFrame({
+        "Location": df_jp["Location"],
+        "Highlight_JP": df_jp["Highlight"],
+        "Note": df_jp["Note"],
+        "Highlight_EN": np.asarray(sentences, dtype=object)[best_idx],
+        "Similarity": best_sim.astype(np.float64),
     })
+    df_out.to_csv(ALIGNMENT_PATH, index=False)
 
 
-df_out = pd.DataFrame(matches)
-df_out.to_csv(ALIGNMENT_PATH, index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -6,31 +6,41 @@ from pathlib import Path
 # --- 日本語フォントに設定---
 plt.rcParams['font.family'] = 'MS Gothic'
 
-# --- CSV 読み込み ---
-df = pd.read_csv("test_data.csv",encoding="utf-8", engine="python")
-
-# --- 必要な2列だけ抽出 ---
+# --- 必要な2列 ---
 col_method = "翻訳技法"
 col_dmis   = "DMIS"
 
-# --- 前処理：文字列化前後スペース削除、欠損は空文字に ---
-df[col_method] = df[col_method].astype(str).str.strip().fillna("")
-df[col_dmis]   = df[col_dmis].astype(str).str.strip().fillna("")
+# --- CSV 読み込み（C エンジンで必要な2列だけをカテゴリ型として読み込む）---
+df = pd.read_csv("test_data.csv", encoding="utf-8", usecols=[col_method, col_dmis],
+                 dtype={col_method: "category", col_dmis: "category"}, memory_map=True)
 
 # 想定するカテゴリ
 dmis_order = ['Denial', 'Minimization', 'Acceptance', 'Adaptation']
-methods_order = ['Amplification', 'Borrowing', 'Established equivalent', 'Reduction', 'Description', 'Generalization', 'Adaptation', 'Literal translation', 'Particulization', 'Adaptation']
+methods_order = ['Amplification', 'Borrowing', 'Established equivalent', 'Reduction', 'Description', 'Generalization', 'Adaptation', 'Literal translation', 'Particulization']
+
+# カテゴリが重複するとヒートマップに同じ行・列が二重に描かれるため、重複がないことを確認
+assert len(set(dmis_order)) == len(dmis_order), "dmis_order に重複があります"
+assert len(set(methods_order)) == len(methods_order), "methods_order に重複があります"
+
+# --- 前処理：前後スペース削除（カテゴリ型なのでラベルの種類ごとに1回だけ処理される）---
+method_labels = df[col_method].str.strip()
+dmis_labels   = df[col_dmis].str.strip()
+
+# --- 想定するカテゴリの Categorical に変換（未知のラベルと欠損は NaN になる）---
+cats_m = pd.Categorical(method_labels, categories=methods_order)
+cats_d = pd.Categorical(dmis_labels, categories=dmis_order)
 
 # --- 4. 未知ラベルの存在チェック（ログ出力） ---
-unknown_dmis = sorted(set(df[col_dmis].unique()) - set(dmis_order))
-unknown_methods = sorted(set(df[col_method].unique()) - set(methods_order))
+unknown_dmis = sorted(dmis_labels[cats_d.isna()].dropna().unique())
+unknown_methods = sorted(method_labels[cats_m.isna()].dropna().unique())
 if unknown_dmis:
     print("未定義の DMIS ラベル（修正が必要）:", unknown_dmis)
 if unknown_methods:
     print("未定義の翻訳手法ラベル（修正が必要）:", unknown_methods)
 
 # --- 3. クロス集計（頻度表） ---
-crosstab = pd.crosstab(df[col_method], df[col_dmis])
+# （Categorical のコード（整数）で集計し、データに出てこないカテゴリも 0 件として残す）
+crosstab = pd.crosstab(cats_m, cats_d, rownames=[col_method], colnames=[col_dmis], dropna=False)
 crosstab = crosstab.reindex(index=methods_order, columns=dmis_order, fill_value=0)
 
 
@@ -4,7 +4,7 @@ import matplotlib.pyplot as plt
 # --- 日本語フォントに設定---
 plt.rcParams['font.family'] = 'MS Gothic'
 
-# --- CSV 読み込み ---
-df = pd.read_csv("dmis_ineko.csv",encoding="utf-8", engine="python")
+# --- CSV 読み込み（C エンジン）---
+df = pd.read_csv("dmis_ineko.csv", encoding="utf-8")
 print("dmis:",df["dims_stage"].unique())
 print("翻訳手法:",df["translation_method"].unique())
\ No newline at end of file
@@ -1,6 +1,6 @@
 """Kindle メモの HTML からハイライト情報を CSV に書き出すスクリプト。"""
 from pathlib import Path  # OSに依存しないパス操作ができる
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 import csv
 
 
@@ -8,54 +8,76 @@ BASE_DIR = Path(__file__).resolve().parent# 親ディレクトリのパス
 HTML_PATH = BASE_DIR / "notebook.htm"   # https://read.amazon.co.jp/notebook のHTMLに変換したHTMLファイルのパス
 CSV_PATH = Path("../data/raw").resolve() / "highlights_jpn.csv"  # 出力先のCSVファイルの名前
 
-records = []  # 収集したハイライト情報を格納するリスト
+record_count = 0  # 書き出したハイライト情報の件数
+
+# 要素の探索は CSS セレクタを使わず、lxml の id / class / パス指定による検索で行う
+ANNOTATIONS_ID = "kp-notebook-annotations"  # ノートブロックをまとめる要素の id
+PATH_LOCATION = ".//input[@id='kp-annotation-location']"  # 位置情報
+
+
+def descendants_with_class(class_name):
+    """要素自身を含めず、子孫要素から class_name を持つ要素を探す XPath を作る。"""
+    # find_class は要素自身も対象にするため、id 付きのハイライトの div 自体もハイライトを持つブロックとして扱われてしまう
+    return etree.XPath(f"descendant::*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]")
+
+
+FIND_HIGHLIGHT = descendants_with_class("kp-notebook-highlight")  # ハイライト
+FIND_NOTE = descendants_with_class("kp-notebook-note")  # メモ
+
+
+def get_text(el, separator=""):
+    """要素内の各テキストの前後の空白を除き、separator で連結して返す。"""
+    return separator.join(text.strip() for text in el.itertext() if text.strip())
 
 
 # Kindle ノート HTML を読み込み、パースして操作しやすいオブジェクトに変換する
-with HTML_PATH.open("r", encoding="utf-8") as f:
-    soup = BeautifulSoup(f, "html.parser")
+# バイト列のまま文字コードを指定して渡し、文字コードの自動判定を省く
+tree = lxml_html.document_fromstring(HTML_PATH.read_bytes(), parser=lxml_html.HTMLParser(encoding="utf-8"))
 
 # id="kp-notebook-annotations"要素配下の各ノートブロックを抽出
-blocks = soup.select("#kp-notebook-annotations div[id]")
+# （id から親要素を直接引き、その直下の id 付き div だけをたどる。ハイライトやメモの div も id を持つため、子孫まではたどらない）
+blocks = tree.get_element_by_id(ANNOTATIONS_ID).findall("div[@id]")
 print(len(blocks))
-for block in blocks:
-    """ハイライト部分の抽出"""
-    # ブロック内からハイライトの要素を取得
-    highlight_el = block.select_one(".kp-notebook-highlight")
-
-    # ハイライト要素がなければ無視（メモのみのブロック等を排除）
-    if not highlight_el:
-        continue
-
-    # ハイライトされているテキストを取得（半角スペースがある場合無くす）
-    highlight = highlight_el.get_text(strip=True).replace(" ", "")
-
-    """ロケーション部分の抽出"""
-    location = ""
-    # input フィールドに保存されている位置情報を優先して取得
-    loc_input = block.find("input", id="kp-annotation-location")
-    if loc_input and loc_input.has_attr("value"):
-        location = loc_input["value"].strip()
-    
-    """メモ部分の抽出"""
-    # メモが付いている場合だけテキストを取得する
-    note_el = block.select_one(".kp-notebook-note")
-    if note_el:
-        note_words_str = note_el.get_text(" ", strip=True).replace("メモ", "") # 例 => 儒者 切支丹
-        note_words_list = note_words_str.split() # 例 => ['儒者', '切支丹']
-    else:
-        note_words_list = []
-        print(location, ":", "メモを書き忘れています！！！")
-    
 
-    # CSV 出力用に、位置・ハイライト・メモのセットを保存
-    for note_word in note_words_list:
-        records.append([location, highlight, note_word])
-
-# 結果を CSV として書き出し、ヘッダ行を付与する
-with CSV_PATH.open("w", newline="", encoding="utf-8") as f:
+# 出力先の CSV を先に開いてヘッダ行を付与し、抽出した行をその都度書き出す（1MB の書き込みバッファ）
+with CSV_PATH.open("w", newline="", encoding="utf-8", buffering=1 << 20) as f:
     writer = csv.writer(f)
     writer.writerow(["Location", "Highlight", "Note"])
-    writer.writerows(records)
 
-print(f"抽出完了：{len(records)} 件を {CSV_PATH.name} に保存しました。")
+    for block in blocks:
+        """ハイライト部分の抽出"""
+        # ブロック内からハイライトの要素を取得
+        highlight_els = FIND_HIGHLIGHT(block)
+
+        # ハイライト要素がなければ無視（メモのみのブロック等を排除）
+        if not highlight_els:
+            continue
+
+        # ハイライトされているテキストを取得（半角スペースがある場合無くす）
+        highlight = get_text(highlight_els[0]).replace(" ", "")
+
+        """ロケーション部分の抽出"""
+        location = ""
+        # input フィールドに保存されている位置情報を優先して取得
+        loc_input = block.find(PATH_LOCATION)
+        if loc_input is not None and loc_input.get("value") is not None:
+            location = loc_input.get("value").strip()
+    
+        """メモ部分の抽出"""
+        # メモが付いている場合だけテキストを取得する
+        note_els = FIND_NOTE(block)
+        if note_els:
+            # 先頭の「メモ」ラベルだけを取り除く（例 => メモ 儒者 切支丹）
+            note_words_str = get_text(note_els[0], " ").removeprefix("メモ") # 例 => 儒者 切支丹
+            note_words_list = note_words_str.split() # 例 => ['儒者', '切支丹']
+        else:
+            note_words_list = []
+            print(location, ":", "メモを書き忘れています！！！")
+    
+
+        # 位置・ハイライト・メモのセットを CSV に書き出す
+        for note_word in note_words_list:
+            writer.writerow([location, highlight, note_word])
+            record_count += 1
+
+print(f"抽出完了：{record_count} 件を {CSV_PATH.name} に保存しました。")